@@ -2,89 +2,288 @@
 import sys
 import os
 import mimetypes
+import codecs
 import subprocess
 import json
 import fnmatch
+import re
 import logging
-from collections import defaultdict
+import queue
+import time
+import stat
+import tempfile
+import functools
+from collections import deque
+from logging.handlers import QueueHandler, QueueListener
+from concurrent.futures import ThreadPoolExecutor
 from PyQt5.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QPushButton, QFileDialog,
     QLabel, QTreeWidget, QTreeWidgetItem, QHBoxLayout, QLineEdit,
     QProgressBar, QMessageBox, QRadioButton, QButtonGroup, QCheckBox,
     QGroupBox, QScrollArea, QGridLayout, QSizePolicy, QSpacerItem,
-    QTabWidget, QTextEdit, QListWidget, QListWidgetItem, QSplitter, QInputDialog, QAction
+    QTabWidget, QPlainTextEdit, QListWidget, QListWidgetItem, QSplitter, QInputDialog, QAction
 )
-from PyQt5.QtCore import Qt, QThread, pyqtSignal, QTimer
+from PyQt5.QtCore import Qt, QThread, pyqtSignal, QTimer, QMimeData, QByteArray
 from PyQt5.QtGui import QClipboard, QIcon, QKeySequence
 
-# Configure logging
+try:
+    import orjson  # Optional: faster config parsing
+except ImportError:
+    orjson = None
+
+# Configure logging. Records are queued and written to the file by a listener thread,
+# so the UI and worker threads never block on log file I/O.
+log_file_handler = logging.FileHandler('concatenator.log', mode='w')
+log_file_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+log_queue = queue.SimpleQueue()
+log_listener = QueueListener(log_queue, log_file_handler)
+log_queue_handler = QueueHandler(log_queue)
+log_queue_handler.setFormatter(logging.Formatter('%(message)s'))  # Layout is applied by log_file_handler
 logging.basicConfig(
-    filename='concatenator.log',
-    filemode='w',
-    format='%(asctime)s - %(levelname)s - %(message)s',
+    handlers=[log_queue_handler],
     level=logging.DEBUG
 )
+log_listener.start()
 
 CONFIG_FILE = 'config.json'
+READ_WORKERS = min(32, (os.cpu_count() or 1) * 4)  # Thread pool size for file reads
+READ_AHEAD = READ_WORKERS * 4  # Reads submitted ahead of the file being written
+WALK_WORKERS = 8  # Maximum selected folders walked concurrently
+COUNT_CHUNK_SIZE = 1 << 20  # Window size when counting words in large files
+PROGRESS_INTERVAL = 0.05  # Minimum seconds between progress signals (~20 Hz)
+OUTPUT_BUFFER_SIZE = 1 << 20  # Write buffer for the output file
+PREVIEW_CHARS = 1000  # Characters shown in the Output tab preview
+PREVIEW_BYTES = PREVIEW_CHARS * 4  # UTF-8 bytes kept to build the preview
+THREAD_STOP_TIMEOUT_MS = 2000  # How long closeEvent waits for a cancelled worker
+SEARCH_DEBOUNCE_MS = 150  # Typing pause before the tree filter runs
+WHITESPACE_TABLE = bytes(32 if chr(byte).isspace() else 120 for byte in range(128)) + b'x' * 128  # ASCII str.split() whitespace -> b' ', rest -> b'x'
+
+def prune_selected_paths(paths):
+    # Drop duplicates and any path already covered by a selected ancestor folder,
+    # keeping the original order. Shorter paths are visited first so every ancestor
+    # is known before its descendants are checked.
+    covered = set()
+    kept = set()
+    for path in sorted(set(paths), key=len):
+        key = os.path.normcase(os.path.normpath(path))
+        ancestor = key
+        while ancestor not in covered:
+            parent = os.path.dirname(ancestor)
+            if parent == ancestor:
+                covered.add(key)
+                kept.add(path)
+                break
+            ancestor = parent
+    pruned = []
+    for path in paths:
+        if path in kept:
+            pruned.append(path)
+            kept.discard(path)
+    return pruned
+
+def compile_ignore_patterns(patterns):
+    # Patterns without wildcards are plain names, tested with a set lookup; the glob
+    # patterns are fused into one regex so each name is matched with a single call.
+    # Returns None when there is nothing to match. Case-insensitive on Windows, like fnmatch.
+    if not patterns:
+        return None
+    case_insensitive = os.name == 'nt'
+    literals = set()
+    globs = []
+    for pattern in patterns:
+        if any(char in pattern for char in '*?['):
+            globs.append(pattern)
+        else:
+            literals.add(pattern.lower() if case_insensitive else pattern)
+    regex_match = None
+    if globs:
+        flags = re.IGNORECASE if case_insensitive else 0
+        regex_match = re.compile('|'.join(f'(?:{fnmatch.translate(pattern)})' for pattern in globs), flags).match
+    if not literals:
+        return regex_match
+    literals = frozenset(literals)
+    if regex_match is None and not case_insensitive:
+        return literals.__contains__
+
+    def match(name):
+        if (name.lower() if case_insensitive else name) in literals:
+            return True
+        return regex_match is not None and regex_match(name) is not None
+
+    return match
+
+def normalize_extensions(extensions):
+    # Lower-case the extensions and give each a leading dot, so "PY" and ".py" agree
+    return frozenset(
+        ext if ext.startswith('.') else '.' + ext
+        for ext in (ext.lower() for ext in extensions or ())
+    )
+
+def make_extension_filter(extensions):
+    # Build a name -> bool test for the given lower-cased extensions. str.endswith
+    # with a tuple scans all suffixes in C, and the name is only lower-cased when
+    # it actually contains upper-case characters.
+    suffixes = tuple(extensions)
+
+    def is_included(name):
+        if not name.islower():
+            name = name.lower()
+        if not name.endswith(suffixes):
+            return False
+        # A leading dot does not start an extension (.bashrc, .py), as with os.path.splitext
+        return name[0] != '.' or '.' in name.lstrip('.')
+
+    return is_included
+
+def make_name_filter(extensions, ignore_match):
+    # Single name -> bool test for a run: an included extension and no ignore pattern
+    # match. The callables are bound as defaults so each call only does local lookups.
+    is_included = make_extension_filter(extensions)
+    if ignore_match is None:
+        return is_included
+
+    def should_include(name, is_included=is_included, ignore_match=ignore_match):
+        return is_included(name) and not ignore_match(name)
+
+    return should_include
+
+@functools.lru_cache(maxsize=4)  # Re-running Generate on the same selection reuses the tree
+def generate_file_tree(files, root_directory):
+    # Split each file into its path components relative to the root directory. Paths
+    # found by the walk start with the root itself, so slicing off the prefix avoids
+    # os.path.relpath's normalization; anything else still goes through relpath.
+    base = os.path.join(root_directory, '') if root_directory else None
+    base_length = len(base) if base else 0
+    sep = os.sep
+    paths = set()
+    for file_path in files:
+        if base and file_path.startswith(base):
+            paths.add(tuple(file_path[base_length:].split(sep)))
+            continue
+        try:
+            paths.add(tuple(os.path.relpath(file_path, root_directory).split(sep)))
+        except ValueError:
+            # In case file_path is not under root_directory
+            paths.add((os.path.basename(file_path),))
+
+    # Sorting the component tuples orders every level of the tree at once, so the
+    # tree is written in a single pass: each path only emits the components that
+    # differ from the previous path, indented by their depth.
+    lines = []
+    previous = ()
+    for parts in sorted(paths):
+        common = 0
+        while common < len(parts) - 1 and common < len(previous) and parts[common] == previous[common]:
+            common += 1
+        for depth in range(common, len(parts)):
+            lines.append("    " * depth + f"- {parts[depth]}\n")
+        previous = parts
+
+    return "".join(lines)
+
+def output_file_mode(path):
+    # Permissions for the output: keep an existing file's mode, otherwise what open() would create
+    try:
+        return stat.S_IMODE(os.stat(path).st_mode)
+    except OSError:
+        umask = os.umask(0)
+        os.umask(umask)
+        return 0o666 & ~umask
+
+def format_output_header(file_tree):
+    return f"Output File Tree:\n{file_tree}\n\nConcatenated Contents:\n"
+
+def count_words(data):
+    # Same count as len(data.decode().split()) for ASCII data without building the token
+    # list: every word starts either at the beginning of the data or right after whitespace
+    mapped = data.translate(WHITESPACE_TABLE)
+    return mapped.count(b' x') + mapped.startswith(b'x')
+
+def count_words_and_chars(data):
+    # Word and character counts of UTF-8 bytes, decoding only when not plain ASCII
+    if len(data) > COUNT_CHUNK_SIZE:
+        return count_words_and_chars_chunked(data)
+    if data.isascii():
+        return count_words(data), len(data)
+    text = data.decode('utf-8', errors='replace')
+    return len(text.split()), len(text)
+
+def count_words_and_chars_chunked(data):
+    # Same counts over a large file, a window at a time so it is never decoded whole.
+    # ASCII windows use the byte fast path; anything else is counted on the decoded text
+    # so Unicode whitespace splits words exactly as str.split() does.
+    words = 0
+    chars = 0
+    previous_ends_in_word = False
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+
+    def count_text(text):
+        nonlocal words, chars, previous_ends_in_word
+        if not text:
+            return  # Only part of a multi-byte character so far
+        words += len(text.split())
+        if previous_ends_in_word and not text[0].isspace():
+            words -= 1  # A word straddles the window boundary
+        previous_ends_in_word = not text[-1].isspace()
+        chars += len(text)
+
+    for start in range(0, len(data), COUNT_CHUNK_SIZE):
+        chunk = data[start:start + COUNT_CHUNK_SIZE]
+        if chunk.isascii() and not decoder.getstate()[0]:
+            words += count_words(chunk)
+            if previous_ends_in_word and not chr(chunk[0]).isspace():
+                words -= 1  # A word straddles the window boundary
+            previous_ends_in_word = not chr(chunk[-1]).isspace()
+            chars += len(chunk)
+        else:
+            count_text(decoder.decode(chunk))
+    count_text(decoder.decode(b'', final=True))
+    return words, chars
 
 class FileConcatenatorThread(QThread):
-    progress_update = pyqtSignal(int, str)  # Emit progress percent and current file
+    progress_update = pyqtSignal(int, int, str)  # Emit files done, total files and current file
     status_update = pyqtSignal(str)
     error_occurred = pyqtSignal(str)
-    finished_successfully = pyqtSignal(str, list, list)  # Emit concatenated text, list of files, error list
+    finished_successfully = pyqtSignal(dict, list, list)  # Emit output summary, list of files, error list
 
-    def __init__(self, selected_paths, git_tracked=False, directory_ignore_patterns=None, file_ignore_patterns=None, include_extensions=None):
+    def __init__(self, selected_paths, git_tracked=False, directory_ignore_patterns=None, file_ignore_patterns=None, include_extensions=None, respect_gitignore=False,
+                 root_directory="", output_file_path=None, collect_output=True):
         super().__init__()
-        self.selected_paths = selected_paths
+        self.selected_paths = prune_selected_paths(selected_paths)
+        self.root_directory = root_directory  # File tree paths are relative to this
+        self.output_file_path = output_file_path  # Stream the output here when set
+        self.collect_output = collect_output  # Keep the full output in memory (for the clipboard)
         self.git_tracked = git_tracked
-        self.directory_ignore_patterns = directory_ignore_patterns if directory_ignore_patterns else []
+        self.respect_gitignore = respect_gitignore
+        self.directory_ignore_patterns = frozenset(directory_ignore_patterns) if directory_ignore_patterns else frozenset()
         self.file_ignore_patterns = file_ignore_patterns if file_ignore_patterns else []
-        self.include_extensions = set(ext.lower() for ext in include_extensions) if include_extensions else set()
-        self.text_file_extensions = self.include_extensions  # Alias for clarity
+        self.file_ignore_match = compile_ignore_patterns(self.file_ignore_patterns)
+        self.include_extensions = normalize_extensions(include_extensions)  # Normalized once
+        self.should_include_name = make_name_filter(self.include_extensions, self.file_ignore_match)  # Specialized once per run
+        self.log_each_file = logging.getLogger().isEnabledFor(logging.DEBUG)  # Skip building per-file messages otherwise
         self._is_cancelled = False
 
         # Caching for Git repositories and tracked files
-        self.repo_roots = {}  # Cache for repository roots
-        self.tracked_files_cache = defaultdict(set)  # Cache for tracked files per repo
+        self.repo_roots = {}  # Cache for repository roots, keyed by directory
+        self.tracked_files_cache = {}  # Cache for tracked files per repo
 
     def run(self):
         logging.info("Concatenation thread started.")
         try:
-            # Gather all relevant files from selected paths
-            all_files = []
-            for path in self.selected_paths:
-                if self._is_cancelled:
-                    self.status_update.emit("Operation cancelled by user.")
-                    logging.info("Operation cancelled by user.")
-                    return
-                if os.path.isfile(path):
-                    if self.is_included_file(path) and not self.is_ignored_file(path):
-                        if self.git_tracked:
-                            if self.is_git_tracked(path):
-                                all_files.append(path)
-                        else:
-                            all_files.append(path)
-                elif os.path.isdir(path):
-                    for root, dirs, files in os.walk(path, topdown=True):
-                        if self._is_cancelled:
-                            self.status_update.emit("Operation cancelled by user.")
-                            logging.info("Operation cancelled by user.")
-                            return
-                        # Modify dirs in-place to skip ignored directories
-                        dirs[:] = [d for d in dirs if d not in self.directory_ignore_patterns]
-                        for file in files:
-                            if self._is_cancelled:
-                                self.status_update.emit("Operation cancelled by user.")
-                                logging.info("Operation cancelled by user.")
-                                return
-                            file_path = os.path.join(root, file)
-                            if self.is_included_file(file_path) and not self.is_ignored_file(file_path):
-                                if self.git_tracked:
-                                    if self.is_git_tracked(file_path):
-                                        all_files.append(file_path)
-                                else:
-                                    all_files.append(file_path)
+            # Gather all relevant files from selected paths. The list is materialized
+            # because both the progress percentage and the file tree need the full count.
+            candidates = list(self.iter_candidates())
+            if self._is_cancelled:
+                self.status_update.emit("Operation cancelled by user.")
+                logging.info("Operation cancelled by user.")
+                return
+
+            # Tracked files are never reported as ignored, so this only matters for "All Files"
+            if self.respect_gitignore and not self.git_tracked:
+                ignored = self.find_git_ignored([file_path for file_path, _ in candidates])
+                candidates = [candidate for candidate in candidates if candidate[0] not in ignored]
 
+            all_files = [file_path for file_path, _ in candidates]
             total_files = len(all_files)
             logging.info(f"Total files to process: {total_files}")
             if total_files == 0:
@@ -93,114 +292,357 @@ class FileConcatenatorThread(QThread):
                 logging.warning(error_message)
                 return
 
-            self.status_update.emit("Starting concatenation...")
-            concatenated_text = ""
-            error_list = []
-            for index, file_path in enumerate(all_files, start=1):
-                if self._is_cancelled:
-                    self.status_update.emit("Operation cancelled by user.")
-                    logging.info("Operation cancelled by user.")
-                    return
+            file_tree = generate_file_tree(tuple(all_files), self.root_directory)  # Hashable for the cache
+            output_header = format_output_header(file_tree).encode('utf-8')
+
+            # Stream to a temporary file next to the output so memory stays bounded by the
+            # files in flight; the contents are only accumulated when the clipboard needs
+            # them. The temporary file replaces the output only once the run completes, so
+            # a cancelled or failed run leaves the previous output untouched.
+            outfile = None
+            if self.output_file_path:
                 try:
-                    with open(file_path, 'r', encoding='utf-8') as infile:
-                        content = infile.read()
-                        # Prepend file name as a header
-                        header = f"=== {os.path.basename(file_path)} ===\n"
-                        concatenated_text += header + content + '\n\n'  # Separator between files
-                except Exception as e:
-                    error_message = f"Error reading {file_path}: {str(e)}"
-                    error_list.append(error_message)
+                    outfile = tempfile.NamedTemporaryFile(
+                        dir=os.path.dirname(os.path.abspath(self.output_file_path)),
+                        prefix='.concatenated-', suffix='.tmp', delete=False, buffering=OUTPUT_BUFFER_SIZE)
+                except OSError as e:
+                    error_message = f"Failed to save file: {str(e)}"
+                    self.error_occurred.emit(error_message)
                     logging.error(error_message)
-                    continue  # Continue processing other files
-                progress_percent = int((index / total_files) * 100)
-                self.progress_update.emit(progress_percent, os.path.basename(file_path))
-                self.status_update.emit(f"Processing {os.path.basename(file_path)} ({index}/{total_files})")
-                logging.debug(f"Processed file: {file_path} ({index}/{total_files})")
+                    return
 
+            self.status_update.emit("Starting concatenation...")
+            parts = [output_header] if self.collect_output else []  # Complete output, for the clipboard
+            preview_parts = []  # Leading bytes of the contents, enough for the preview
+            preview_size = 0
+            word_count = 0
+            char_count = 0
+            error_list = []
+            last_percent = -1
+            last_emit = time.monotonic()
+            completed = False
+            try:
+                if outfile:
+                    outfile.write(output_header)
+                # File reads release the GIL, so a thread pool overlaps their I/O latency.
+                # Results are consumed in submission order to keep the output order stable.
+                with ThreadPoolExecutor(max_workers=READ_WORKERS) as executor:
+                    for index, ((file_path, name), future) in enumerate(self.iter_reads(executor, candidates), start=1):
+                        if self._is_cancelled:
+                            executor.shutdown(wait=False, cancel_futures=True)
+                            self.status_update.emit("Operation cancelled by user.")
+                            logging.info("Operation cancelled by user.")
+                            return
+                        try:
+                            content = future.result()
+                        except Exception as e:
+                            error_message = f"Error reading {file_path}: {str(e)}"
+                            error_list.append(error_message)
+                            logging.error(error_message)
+                            continue  # Continue processing other files
+                        # Prepend file name as a header, with a separator between files
+                        header = f"=== {name} ===\n".encode('utf-8')
+                        if outfile:
+                            outfile.write(header)
+                            outfile.write(content)
+                            outfile.write(b'\n\n')
+                        if self.collect_output:
+                            parts.append(header)
+                            parts.append(content)
+                            parts.append(b'\n\n')
+                        if preview_size < PREVIEW_BYTES:
+                            preview_parts.append(header)
+                            preview_parts.append(content[:PREVIEW_BYTES])
+                            preview_parts.append(b'\n\n')
+                            preview_size += len(header) + len(content) + 2
+                        # The header ends in a newline, so counting the pieces separately is exact
+                        for piece in (header, content):
+                            words, chars = count_words_and_chars(piece)
+                            word_count += words
+                            char_count += chars
+                        char_count += 2  # Separator
+                        # Throttle signals so the GUI thread is not flooded on large selections:
+                        # only emit when the percentage moved and PROGRESS_INTERVAL has passed,
+                        # and always for the last file
+                        progress_percent = index * 100 // total_files
+                        now = time.monotonic()
+                        if index == total_files or (progress_percent != last_percent and now - last_emit >= PROGRESS_INTERVAL):
+                            last_emit = now
+                            last_percent = progress_percent
+                            self.progress_update.emit(index, total_files, name)
+                        if self.log_each_file:
+                            logging.debug(f"Processed file: {file_path} ({index}/{total_files})")
+                if outfile:
+                    outfile.close()
+                    os.chmod(outfile.name, output_file_mode(self.output_file_path))  # Temporary files are private
+                    os.replace(outfile.name, self.output_file_path)
+                    logging.info(f"Concatenated text saved to file: {self.output_file_path}")
+                completed = True
+            finally:
+                if outfile and not completed:
+                    outfile.close()
+                    try:
+                        os.unlink(outfile.name)
+                    except OSError:
+                        logging.warning(f"Could not remove temporary output file: {outfile.name}")
+
+            summary = {
+                'file_tree': file_tree,
+                'content': b''.join(parts) if self.collect_output else None,  # UTF-8, header included
+                'preview': b''.join(preview_parts),
+                'word_count': word_count,
+                'char_count': char_count,
+            }
             self.status_update.emit("Concatenation completed successfully.")
             logging.info("Concatenation completed successfully.")
-            self.finished_successfully.emit(concatenated_text, all_files, error_list)
+            self.finished_successfully.emit(summary, all_files, error_list)
         except Exception as e:
             error_msg = f"Unexpected error: {str(e)}"
             self.error_occurred.emit(error_msg)
             logging.exception("An unexpected error occurred in the concatenation thread.")
 
+    def iter_reads(self, executor, candidates):
+        # Yield (candidate, future) pairs in order while keeping at most READ_AHEAD reads
+        # in flight or waiting, so memory stays bounded when writing falls behind
+        pending = deque()
+        for candidate in candidates:
+            pending.append((candidate, executor.submit(self.read_file, candidate[0])))
+            if len(pending) >= READ_AHEAD:
+                yield pending.popleft()
+        while pending:
+            yield pending.popleft()
+
     def cancel(self):
         self._is_cancelled = True
         logging.info("Cancellation requested by user.")
 
-    def is_included_file(self, filepath):
-        # Check by extension
-        _, ext = os.path.splitext(filepath)
-        return ext.lower() in self.text_file_extensions
+    def read_file(self, file_path):
+        # Runs on a worker thread of the read pool. Contents stay as raw UTF-8 bytes.
+        # A raw descriptor skips the buffered file object; O_BINARY matters on Windows.
+        fd = os.open(file_path, os.O_RDONLY | getattr(os, 'O_BINARY', 0))
+        try:
+            # Contents are always read into bytes, never handed on as a memory map: a file
+            # truncated while its map waits in the read-ahead window would raise SIGBUS
+            size = os.fstat(fd).st_size
+            content = os.read(fd, size)  # One syscall for the whole file in the usual case
+            if len(content) < size:
+                # Short read (FUSE, network filesystems): keep reading until size or EOF
+                chunks = [content]
+                remaining = size - len(content)
+                while remaining:
+                    chunk = os.read(fd, remaining)
+                    if not chunk:
+                        break
+                    chunks.append(chunk)
+                    remaining -= len(chunk)
+                content = b''.join(chunks)
+        finally:
+            os.close(fd)
+        # Match text-mode universal newlines
+        if b'\r' in content:
+            content = content.replace(b'\r\n', b'\n').replace(b'\r', b'\n')
+        return content
+
+    def iter_candidates(self):
+        # Yield (path, name) for every selected file that passes the extension,
+        # ignore-pattern and git-tracked filters. Stops early on cancel.
+        directory_count = sum(1 for path in self.selected_paths if os.path.isdir(path))
+        if directory_count < 2:
+            for path in self.selected_paths:
+                yield from self.iter_path_candidates(path)
+            return
 
-    def is_ignored_file(self, filepath):
-        # Check if file matches any ignore pattern
-        filename = os.path.basename(filepath)
-        for pattern in self.file_ignore_patterns:
-            if fnmatch.fnmatch(filename, pattern):
-                logging.debug(f"Ignored file due to pattern: {filepath}")
-                return True
-        return False
+        # Selected folders are disjoint after pruning, so their walks are independent
+        # and I/O bound; run them concurrently and merge in selection order.
+        with ThreadPoolExecutor(max_workers=min(WALK_WORKERS, directory_count)) as executor:
+            for candidates in executor.map(lambda path: list(self.iter_path_candidates(path)), self.selected_paths):
+                yield from candidates
+
+    def iter_path_candidates(self, path):
+        if self._is_cancelled:
+            return
+        if os.path.isfile(path):
+            name = os.path.basename(path)
+            if not self.should_include_name(name):
+                return
+            entries = [(name, path)]
+        elif os.path.isdir(path):
+            entries = self.iter_files(path)  # Already filtered by name
+        else:
+            return
+        # Name checks are done; only the Git lookup remains. Without Git filtering every
+        # entry passes, so the per-entry check is skipped entirely.
+        if not self.git_tracked:
+            for name, file_path in entries:
+                if self._is_cancelled:
+                    return
+                yield file_path, name
+            return
+        is_git_tracked = self.is_git_tracked
+        for name, file_path in entries:
+            if self._is_cancelled:
+                return
+            if is_git_tracked(file_path):
+                yield file_path, name
+
+    def iter_files(self, top):
+        # Depth-first scandir walk yielding (name, path) for every included, non-ignored
+        # file under top. DirEntry caches the file type from readdir, so no extra stat
+        # per entry, and excluded names are dropped before their path is even built.
+        should_include_name = self.should_include_name
+        directory_ignore_patterns = self.directory_ignore_patterns
+        stack = [top]
+        while stack and not self._is_cancelled:
+            current = stack.pop()
+            subdirs = []
+            try:
+                with os.scandir(current) as entries:
+                    for entry in entries:
+                        # Classified from the dirent type alone: symlinks are neither a
+                        # directory nor a file here, so they are skipped without a stat
+                        if entry.is_dir(follow_symlinks=False):
+                            if entry.name not in directory_ignore_patterns:
+                                subdirs.append(entry.path)
+                        elif entry.is_file(follow_symlinks=False):
+                            name = entry.name
+                            if should_include_name(name):
+                                yield name, entry.path
+            except OSError as e:
+                logging.warning(f"Cannot scan directory {current}: {str(e)}")
+                continue
+            # Reverse so subdirectories are visited in listing order, as os.walk does
+            stack.extend(reversed(subdirs))
 
     def is_git_tracked(self, filepath):
         try:
             repo_root = self.get_git_repo_root(filepath)
             if not repo_root:
-                logging.debug(f"No Git repository found for file: {filepath}")
-                return False
-
-            # Check if tracked files are already cached for this repo
-            if repo_root in self.tracked_files_cache:
-                rel_path = os.path.relpath(filepath, repo_root)
-                is_tracked = rel_path in self.tracked_files_cache[repo_root]
-                logging.debug(f"Cache hit for {filepath}: {'Tracked' if is_tracked else 'Untracked'}")
-                return is_tracked
-
-            # If not cached, retrieve all tracked files for the repo
-            creationflags = 0
-            if sys.platform.startswith('win'):
-                creationflags = subprocess.CREATE_NO_WINDOW
-
-            try:
-                result = subprocess.run(
-                    ['git', 'ls-files'],
-                    cwd=repo_root,
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
-                    text=True,
-                    creationflags=creationflags,
-                    timeout=10  # 10 seconds timeout
-                )
-            except subprocess.TimeoutExpired:
-                error_message = f"Git command timed out for repository: {repo_root}"
-                self.error_occurred.emit(error_message)
-                logging.error(error_message)
+                if self.log_each_file:
+                    logging.debug(f"No Git repository found for file: {filepath}")
                 return False
 
-            if result.returncode == 0:
-                tracked_files = set(result.stdout.strip().split('\n'))
+            # Tracked files are listed once per repository and cached as normalized absolute paths
+            tracked_files = self.tracked_files_cache.get(repo_root)
+            if tracked_files is None:
+                tracked_files = self.list_tracked_files(repo_root)
+                if tracked_files is None:
+                    return False
                 self.tracked_files_cache[repo_root] = tracked_files
-                rel_path = os.path.relpath(filepath, repo_root)
-                is_tracked = rel_path in tracked_files
+
+            is_tracked = os.path.normcase(os.path.abspath(filepath)) in tracked_files
+            if self.log_each_file:
                 logging.debug(f"File {filepath} is {'tracked' if is_tracked else 'untracked'} in Git repository.")
-                return is_tracked
-            else:
-                error_message = f"Git error in repository {repo_root}: {result.stderr.strip()}"
-                self.error_occurred.emit(error_message)
-                logging.error(error_message)
-                return False
+            return is_tracked
         except Exception as e:
             error_message = f"Error checking Git status for {filepath}: {str(e)}"
             self.error_occurred.emit(error_message)
             logging.exception(error_message)
             return False
 
-    def get_git_repo_root(self, filepath):
-        if filepath in self.repo_roots:
-            logging.debug(f"Repo root for {filepath} fetched from cache.")
-            return self.repo_roots[filepath]
+    def find_git_ignored(self, files):
+        # Group candidates by repository so each repo needs one check-ignore call
+        files_by_repo = {}
+        for file_path in files:
+            repo_root = self.get_git_repo_root(file_path)
+            if repo_root:
+                files_by_repo.setdefault(repo_root, []).append(file_path)
+
+        ignored = set()
+        for repo_root, repo_files in files_by_repo.items():
+            if self._is_cancelled:
+                break
+            ignored.update(self.list_ignored_files(repo_root, repo_files))
+        if ignored:
+            logging.info(f"Excluded {len(ignored)} files matched by .gitignore rules.")
+        return ignored
+
+    def list_ignored_files(self, repo_root, files):
+        creationflags = 0
+        if sys.platform.startswith('win'):
+            creationflags = subprocess.CREATE_NO_WINDOW
 
+        try:
+            # All candidate paths go through a single process on stdin
+            result = subprocess.run(
+                ['git', '-C', repo_root, 'check-ignore', '--stdin', '-z'],
+                input=''.join(file_path + '\0' for file_path in files),
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True,
+                encoding='utf-8',
+                creationflags=creationflags,
+                timeout=10  # 10 seconds timeout
+            )
+        except subprocess.TimeoutExpired:
+            error_message = f"Git check-ignore timed out for repository: {repo_root}"
+            self.error_occurred.emit(error_message)
+            logging.error(error_message)
+            return set()
+
+        # Exit status 1 means none of the paths are ignored
+        if result.returncode not in (0, 1):
+            logging.error(f"Git check-ignore failed in repository {repo_root}: {result.stderr.strip()}")
+            return set()
+        return {file_path for file_path in result.stdout.split('\0') if file_path}
+
+    def list_tracked_files(self, repo_root):
+        creationflags = 0
+        if sys.platform.startswith('win'):
+            creationflags = subprocess.CREATE_NO_WINDOW
+
+        try:
+            result = subprocess.run(
+                ['git', '-C', repo_root, 'ls-files', '-z'],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True,
+                encoding='utf-8',
+                creationflags=creationflags,
+                timeout=10  # 10 seconds timeout
+            )
+        except subprocess.TimeoutExpired:
+            error_message = f"Git command timed out for repository: {repo_root}"
+            self.error_occurred.emit(error_message)
+            logging.error(error_message)
+            return None
+
+        if result.returncode != 0:
+            error_message = f"Git error in repository {repo_root}: {result.stderr.strip()}"
+            self.error_occurred.emit(error_message)
+            logging.error(error_message)
+            return None
+
+        # -z output is NUL-separated and never quoted, so non-ASCII names survive intact
+        tracked_files = {
+            os.path.normcase(os.path.normpath(os.path.join(repo_root, rel_path)))
+            for rel_path in result.stdout.split('\0') if rel_path
+        }
+        logging.debug(f"Cached {len(tracked_files)} tracked files for repository: {repo_root}")
+        return tracked_files
+
+    def get_git_repo_root(self, filepath):
+        # Files in the same directory share a repository, so cache by directory
+        directory = os.path.dirname(os.path.abspath(filepath))
+        if directory in self.repo_roots:
+            return self.repo_roots[directory]
+
+        # Walk up in Python to the nearest cached ancestor or the nearest directory with
+        # its own .git entry (a directory for normal repositories, a file for submodules
+        # and worktrees); every directory passed on the way shares that root.
+        unresolved = []
+        current = directory
+        while True:
+            if current in self.repo_roots:
+                return self.cache_repo_root(unresolved, self.repo_roots[current])
+            unresolved.append(current)
+            if os.path.lexists(os.path.join(current, '.git')):
+                return self.cache_repo_root(unresolved, current)
+            parent = os.path.dirname(current)
+            if parent == current:
+                break
+            current = parent
+
+        # No .git entry up to the filesystem root; let git decide (e.g. GIT_DIR is set)
         try:
             creationflags = 0
             if sys.platform.startswith('win'):
@@ -208,7 +650,7 @@ class FileConcatenatorThread(QThread):
 
             result = subprocess.run(
                 ['git', 'rev-parse', '--show-toplevel'],
-                cwd=os.path.dirname(filepath),
+                cwd=directory,
                 stdout=subprocess.PIPE,
                 stderr=subprocess.PIPE,
                 text=True,
@@ -222,13 +664,17 @@ class FileConcatenatorThread(QThread):
             return None
 
         if result.returncode == 0:
-            repo_root = result.stdout.strip()
-            self.repo_roots[filepath] = repo_root
-            logging.debug(f"Found Git repository root for {filepath}: {repo_root}")
-            return repo_root
+            repo_root = os.path.normpath(result.stdout.strip())
+            logging.debug(f"Found Git repository root for {directory}: {repo_root}")
         else:
-            logging.debug(f"No Git repository found for {filepath}: {result.stderr.strip()}")
-            return None
+            repo_root = None
+            logging.debug(f"No Git repository found for {directory}: {result.stderr.strip()}")
+        return self.cache_repo_root(unresolved, repo_root)
+
+    def cache_repo_root(self, directories, repo_root):
+        for directory in directories:
+            self.repo_roots[directory] = repo_root
+        return repo_root
 
 class ConcatenatorApp(QWidget):
     def __init__(self):
@@ -236,8 +682,13 @@ class ConcatenatorApp(QWidget):
         self.setWindowTitle("Text File Concatenator")
         self.setGeometry(100, 100, 1400, 1000)
         self.selected_directory = ""
+        self.checked_paths = set()  # Paths of checked tree items, kept in sync by handle_item_changed
+        self.thread = None  # Running FileConcatenatorThread, released by handle_thread_finished
+        self.success_box = None  # Non-modal completion message from the last run
+        self.last_filter_text = ""  # Search text the tree currently reflects; None forces a re-filter
         self.output_file_path = os.path.join(os.path.expanduser("~"), "concatenated_output.txt")  # Default save location
         self.directory_ignore_patterns = ['node_modules', 'venv', '.git', '__pycache__', 'dist', 'build', 'env', '.idea', '.vscode']
+        self.directory_ignore_set = frozenset(self.directory_ignore_patterns)  # O(1) lookups while browsing
         self.file_ignore_patterns = []  # Initialize file ignore patterns
         self.default_file_extensions = [
             '.txt', '.md', '.py', '.js', '.java', '.cpp', '.c', '.cs', '.html', '.css',
@@ -298,7 +749,7 @@ class ConcatenatorApp(QWidget):
         error_layout = QVBoxLayout()
         error_label = QLabel("Error Log:")
         error_layout.addWidget(error_label)
-        self.error_log = QTextEdit()
+        self.error_log = QPlainTextEdit()  # Plain appends skip the rich-text parser
         self.error_log.setReadOnly(True)
         error_layout.addWidget(self.error_log)
         main_layout.addLayout(error_layout)
@@ -332,7 +783,12 @@ class ConcatenatorApp(QWidget):
 
         self.search_bar = QLineEdit()
         self.search_bar.setPlaceholderText("Search files and folders...")
-        self.search_bar.textChanged.connect(self.filter_tree)
+        # Filter once typing pauses rather than on every keystroke
+        self.filter_timer = QTimer(self)
+        self.filter_timer.setSingleShot(True)
+        self.filter_timer.setInterval(SEARCH_DEBOUNCE_MS)
+        self.filter_timer.timeout.connect(self.apply_search_filter)
+        self.search_bar.textChanged.connect(lambda _text: self.filter_timer.start())
         self.search_bar.setToolTip("Search for specific files or folders in the tree")
         top_layout.addWidget(self.search_bar)
 
@@ -379,6 +835,10 @@ class ConcatenatorApp(QWidget):
         self.tracking_group.addButton(self.git_tracked_radio)
         tracking_layout.addWidget(self.all_files_radio)
         tracking_layout.addWidget(self.git_tracked_radio)
+        self.respect_gitignore_checkbox = QCheckBox("Respect .gitignore")
+        self.respect_gitignore_checkbox.setChecked(False)
+        self.respect_gitignore_checkbox.setToolTip("Skip files ignored by Git when including all files")
+        tracking_layout.addWidget(self.respect_gitignore_checkbox)
         tracking_layout.addStretch()
         tracking_group_box.setLayout(tracking_layout)
         layout.addWidget(tracking_group_box)
@@ -389,9 +849,7 @@ class ConcatenatorApp(QWidget):
 
         # Current Ignore Patterns List
         self.ignore_dir_list = QListWidget()
-        for pattern in self.directory_ignore_patterns:
-            item = QListWidgetItem(pattern)
-            self.ignore_dir_list.addItem(item)
+        self.ignore_dir_list.addItems(self.directory_ignore_patterns)  # One model insert for the whole list
         ignore_dir_layout.addWidget(self.ignore_dir_list)
 
         # Add/Remove Buttons
@@ -416,9 +874,7 @@ class ConcatenatorApp(QWidget):
 
         # Current File Ignore Patterns List
         self.ignore_file_list = QListWidget()
-        for pattern in self.file_ignore_patterns:
-            item = QListWidgetItem(pattern)
-            self.ignore_file_list.addItem(item)
+        self.ignore_file_list.addItems(self.file_ignore_patterns)  # One model insert for the whole list
         ignore_file_layout.addWidget(self.ignore_file_list)
 
         # Add/Remove Buttons
@@ -462,6 +918,8 @@ class ConcatenatorApp(QWidget):
             item = QListWidgetItem(ext)
             item.setCheckState(Qt.Checked)
             self.selected_filetypes.addItem(item)
+        # text_file_extensions follows the check boxes instead of being rebuilt from the list
+        self.selected_filetypes.itemChanged.connect(self.handle_filetype_changed)
         filetype_layout.addLayout(selected_layout)
         filetype_layout.addWidget(self.selected_filetypes)
 
@@ -544,7 +1002,7 @@ class ConcatenatorApp(QWidget):
         # Preview Pane
         preview_group_box = QGroupBox("Preview")
         preview_layout = QVBoxLayout()
-        self.preview_text = QTextEdit()
+        self.preview_text = QPlainTextEdit()  # Line-based layout; the preview is never rich text
         self.preview_text.setReadOnly(True)
         preview_layout.addWidget(self.preview_text)
         preview_group_box.setLayout(preview_layout)
@@ -555,9 +1013,11 @@ class ConcatenatorApp(QWidget):
     def load_config(self):
         if os.path.exists(CONFIG_FILE):
             try:
-                with open(CONFIG_FILE, 'r') as f:
-                    config = json.load(f)
+                with open(CONFIG_FILE, 'rb') as f:
+                    data = f.read()
+                    config = orjson.loads(data) if orjson else json.loads(data)
                     self.directory_ignore_patterns = config.get('directory_ignore_patterns', self.directory_ignore_patterns)
+                    self.directory_ignore_set = frozenset(self.directory_ignore_patterns)
                     self.file_ignore_patterns = config.get('file_ignore_patterns', self.file_ignore_patterns)
                     custom_filetypes = config.get('custom_filetypes', [])
                     self.default_file_extensions.extend([ext for ext in custom_filetypes if ext not in self.default_file_extensions])
@@ -568,9 +1028,10 @@ class ConcatenatorApp(QWidget):
 
     def save_config(self):
         config = {
-            'directory_ignore_patterns': [self.ignore_dir_list.item(i).text() for i in range(self.ignore_dir_list.count())],
-            'file_ignore_patterns': [self.ignore_file_list.item(i).text() for i in range(self.ignore_file_list.count())],
-            'custom_filetypes': [self.selected_filetypes.item(i).text() for i in range(self.selected_filetypes.count()) if self.selected_filetypes.item(i).checkState() == Qt.Checked and self.selected_filetypes.item(i).text() not in self.default_file_extensions]
+            'directory_ignore_patterns': list(self.directory_ignore_patterns),
+            'file_ignore_patterns': list(self.file_ignore_patterns),
+            # text_file_extensions already holds exactly the checked selected filetypes
+            'custom_filetypes': sorted(ext for ext in self.text_file_extensions if ext not in self.default_file_extensions)
         }
         try:
             with open(CONFIG_FILE, 'w') as f:
@@ -588,9 +1049,15 @@ class ConcatenatorApp(QWidget):
             logging.info(f"Selected root directory: {directory}")
 
     def populate_tree(self, directory):
+        self.tree_widget.setUpdatesEnabled(False)
+        self.tree_widget.blockSignals(True)
         self.tree_widget.clear()
+        self.checked_paths.clear()
+        self.last_filter_text = None
         try:
-            root_item = QTreeWidgetItem(self.tree_widget, [os.path.basename(directory), directory])
+            root_name = os.path.basename(directory)
+            root_item = QTreeWidgetItem(self.tree_widget, [root_name, directory])
+            root_item.setData(0, Qt.UserRole, root_name.lower())  # Search key for filter_tree
             root_item.setFlags(root_item.flags() | Qt.ItemIsUserCheckable)
             root_item.setCheckState(0, Qt.Unchecked)
             # Add a dummy child to make the item expandable
@@ -601,28 +1068,46 @@ class ConcatenatorApp(QWidget):
             error_message = f"Failed to populate tree: {str(e)}"
             QMessageBox.critical(self, "Error", error_message)
             logging.exception(error_message)
+        finally:
+            self.tree_widget.blockSignals(False)
+            self.tree_widget.setUpdatesEnabled(True)
 
     def add_children(self, parent_item, parent_path):
+        # Items are built detached and attached in a single addChildren call
+        children = []
+        is_included = make_extension_filter(normalize_extensions(self.text_file_extensions))
+        log_each_entry = logging.getLogger().isEnabledFor(logging.DEBUG)  # Skip building per-entry messages otherwise
         try:
-            for name in os.listdir(parent_path):
-                path = os.path.join(parent_path, name)
+            with os.scandir(parent_path) as it:
+                entries = sorted(it, key=lambda e: e.name.lower())
+            for entry in entries:
+                name = entry.name
+                path = entry.path
+                # Symlinks are not listed, matching the concatenation walk
+                is_dir = entry.is_dir(follow_symlinks=False)
                 # Skip ignored directories
-                if os.path.isdir(path):
-                    if name in self.directory_ignore_patterns:
-                        logging.debug(f"Skipping ignored directory: {path}")
+                if is_dir:
+                    if name in self.directory_ignore_set:
+                        if log_each_entry:
+                            logging.debug(f"Skipping ignored directory: {path}")
                         continue
+                elif not entry.is_file(follow_symlinks=False):
+                    continue
                 # Check file types if it's a file
-                if os.path.isfile(path):
-                    _, ext = os.path.splitext(name)
-                    if ext.lower() not in self.text_file_extensions:
+                elif not is_included(name):
+                    if log_each_entry:
                         logging.debug(f"Skipping file due to extension: {path}")
-                        continue
-                child_item = QTreeWidgetItem(parent_item, [name, path])
+                    continue
+                child_item = QTreeWidgetItem([name, path])
+                child_item.setData(0, Qt.UserRole, name.lower())  # Search key for filter_tree
                 child_item.setFlags(child_item.flags() | Qt.ItemIsUserCheckable)
                 child_item.setCheckState(0, Qt.Unchecked)
-                if os.path.isdir(path):
+                if is_dir:
                     # Add a dummy child to make the item expandable
                     dummy = QTreeWidgetItem(child_item, ["Loading..."])
+                children.append(child_item)
+            parent_item.addChildren(children)
+            self.last_filter_text = None  # New items have not been through the search filter
             logging.debug(f"Added children to {parent_path}")
         except PermissionError:
             logging.warning(f"Permission denied while accessing: {parent_path}")
@@ -632,53 +1117,122 @@ class ConcatenatorApp(QWidget):
 
     def handle_item_expanded(self, item):
         if item.childCount() == 1 and item.child(0).text(0) == "Loading...":
-            item.takeChildren()  # Remove dummy
-            self.add_children(item, item.text(1))
+            # Suspend repaints, item signals and sorting while the children are inserted
+            sorting = self.tree_widget.isSortingEnabled()
+            self.tree_widget.setUpdatesEnabled(False)
+            self.tree_widget.blockSignals(True)
+            self.tree_widget.setSortingEnabled(False)
+            try:
+                item.takeChildren()  # Remove dummy
+                self.add_children(item, item.text(1))
+            finally:
+                self.tree_widget.setSortingEnabled(sorting)
+                self.tree_widget.blockSignals(False)
+                self.tree_widget.setUpdatesEnabled(True)
 
     def handle_item_changed(self, item, column):
         state = item.checkState(0)
-        for i in range(item.childCount()):
-            child = item.child(i)
-            child.setCheckState(0, state)
+        self.set_subtree_check_state([item], state)
         logging.debug(f"Item '{item.text(0)}' set to {'Checked' if state == Qt.Checked else 'Unchecked'}")
 
-    def filter_tree(self, text):
-        def recurse(item):
-            match = text.lower() in item.text(0).lower()
-            child_match = False
-            for i in range(item.childCount()):
-                child = item.child(i)
-                child_visible = recurse(child)
-                child_match = child_match or child_visible
-            item.setHidden(not (match or child_match))
-            return match or child_match
+    def set_subtree_check_state(self, items, state):
+        # Apply state to the items and all their descendants in one iterative pass,
+        # keeping checked_paths in step. Signals are blocked so each setCheckState does
+        # not re-enter handle_item_changed for its own subtree.
+        update_checked = self.checked_paths.add if state == Qt.Checked else self.checked_paths.discard
+        self.tree_widget.blockSignals(True)
+        try:
+            stack = list(items)
+            while stack:
+                current = stack.pop()
+                current.setCheckState(0, state)
+                if current.text(1):  # "Loading..." placeholders have no path
+                    update_checked(current.text(1))
+                for i in range(current.childCount()):
+                    stack.append(current.child(i))
+        finally:
+            self.tree_widget.blockSignals(False)
+
+    def apply_search_filter(self):
+        text = self.search_bar.text()
+        if text == self.last_filter_text:
+            return  # Backspace and retype: the tree already shows this result
+        # One repaint for the whole pass instead of one per setHidden
+        self.tree_widget.setUpdatesEnabled(False)
+        try:
+            self.filter_tree(text)
+        finally:
+            self.tree_widget.setUpdatesEnabled(True)
+        self.last_filter_text = text
 
+    def filter_tree(self, text):
+        needle = text.lower()
         root = self.tree_widget.invisibleRootItem()
-        for i in range(root.childCount()):
-            child = root.child(i)
-            recurse(child)
+        if not needle:
+            # Nothing to match: a single pass unhides everything
+            self.unhide_subtree(root)
+            logging.debug("Cleared tree filter.")
+            return
+
+        # Iterative post-order walk: an item stays visible if it matches or any of its
+        # children is visible. Each stack entry carries its parent's "child visible" flag,
+        # and is pushed back with its own flag once its children have been queued.
+        root_flag = [False]
+        stack = [(root.child(i), root_flag, None) for i in range(root.childCount())]
+        while stack:
+            item, parent_flag, child_visible = stack.pop()
+            if child_visible is None:
+                # Names are lower-cased once when the item is created; placeholders have none
+                search_key = item.data(0, Qt.UserRole)
+                if search_key is not None and needle in search_key:
+                    # A match shows its whole subtree; the descendants need no tests
+                    item.setHidden(False)
+                    self.unhide_subtree(item)
+                    parent_flag[0] = True
+                    continue
+                child_visible = [False]
+                stack.append((item, parent_flag, child_visible))
+                for i in range(item.childCount()):
+                    stack.append((item.child(i), child_visible, None))
+                continue
+            item.setHidden(not child_visible[0])
+            if child_visible[0]:
+                parent_flag[0] = True
         logging.debug(f"Filtered tree with search text: '{text}'")
 
+    def unhide_subtree(self, item):
+        stack = [item]
+        while stack:
+            current = stack.pop()
+            for i in range(current.childCount()):
+                child = current.child(i)
+                child.setHidden(False)
+                stack.append(child)
+
     def select_all_items(self):
-        root = self.tree_widget.invisibleRootItem()
-        for i in range(root.childCount()):
-            child = root.child(i)
-            child.setCheckState(0, Qt.Checked)
+        self.set_all_check_states(Qt.Checked)
         logging.info("All items selected.")
 
     def deselect_all_items(self):
-        root = self.tree_widget.invisibleRootItem()
-        for i in range(root.childCount()):
-            child = root.child(i)
-            child.setCheckState(0, Qt.Unchecked)
+        self.set_all_check_states(Qt.Unchecked)
         logging.info("All items deselected.")
 
+    def set_all_check_states(self, state):
+        # One repaint for the whole tree rather than one per item
+        root = self.tree_widget.invisibleRootItem()
+        self.tree_widget.setUpdatesEnabled(False)
+        try:
+            self.set_subtree_check_state([root.child(i) for i in range(root.childCount())], state)
+        finally:
+            self.tree_widget.setUpdatesEnabled(True)
+
     def add_ignore_directory(self):
         directory = QFileDialog.getExistingDirectory(self, "Add Ignore Directory", "")
         if directory:
             pattern = os.path.basename(directory)
-            if pattern not in self.directory_ignore_patterns:
+            if pattern not in self.directory_ignore_set:
                 self.directory_ignore_patterns.append(pattern)
+                self.directory_ignore_set = frozenset(self.directory_ignore_patterns)
                 self.ignore_dir_list.addItem(pattern)
                 logging.info(f"Added ignore directory pattern: {pattern}")
             else:
@@ -692,6 +1246,7 @@ class ConcatenatorApp(QWidget):
         for item in selected_items:
             pattern = item.text()
             self.directory_ignore_patterns.remove(pattern)
+            self.directory_ignore_set = frozenset(self.directory_ignore_patterns)
             self.ignore_dir_list.takeItem(self.ignore_dir_list.row(item))
             logging.info(f"Removed ignore directory pattern: {pattern}")
 
@@ -722,19 +1277,29 @@ class ConcatenatorApp(QWidget):
             self.ignore_file_list.takeItem(self.ignore_file_list.row(item))
             logging.info(f"Removed file ignore pattern: {pattern}")
 
+    def handle_filetype_changed(self, item):
+        if item.checkState() == Qt.Checked:
+            self.text_file_extensions.add(item.text().lower())
+        else:
+            self.text_file_extensions.discard(item.text().lower())
+
     def move_filetype_to_selected(self):
         selected_items = self.available_filetypes.selectedItems()
+        existing = {self.selected_filetypes.item(i).text() for i in range(self.selected_filetypes.count())}
         for item in selected_items:
-            if item.text() not in [self.selected_filetypes.item(i).text() for i in range(self.selected_filetypes.count())]:
+            if item.text() not in existing:
+                existing.add(item.text())
                 new_item = QListWidgetItem(item.text())
                 new_item.setCheckState(Qt.Checked)
                 self.selected_filetypes.addItem(new_item)
+                self.text_file_extensions.add(item.text().lower())
                 logging.info(f"Moved file type to selected: {item.text()}")
 
     def move_filetype_to_available(self):
         selected_items = self.selected_filetypes.selectedItems()
         for item in selected_items:
             self.selected_filetypes.takeItem(self.selected_filetypes.row(item))
+            self.text_file_extensions.discard(item.text().lower())
             logging.info(f"Moved file type to available: {item.text()}")
 
     def add_custom_filetype(self):
@@ -743,8 +1308,10 @@ class ConcatenatorApp(QWidget):
             QMessageBox.warning(self, "Invalid Extension", "File extension should start with a dot (e.g., .ini)")
             logging.warning(f"Invalid custom file extension attempted to add: '{ext}'")
             return
-        if ext in [self.available_filetypes.item(i).text().lower() for i in range(self.available_filetypes.count())] or \
-           ext in [self.selected_filetypes.item(i).text().lower() for i in range(self.selected_filetypes.count())]:
+        # The available list is built from default_file_extensions and never changes
+        known = {known_ext.lower() for known_ext in self.default_file_extensions}
+        known.update(self.selected_filetypes.item(i).text().lower() for i in range(self.selected_filetypes.count()))
+        if ext in known:
             QMessageBox.warning(self, "Duplicate Extension", f"The extension {ext} is already in the list.")
             logging.warning(f"Attempted to add duplicate custom file extension: {ext}")
             return
@@ -752,6 +1319,7 @@ class ConcatenatorApp(QWidget):
         new_item = QListWidgetItem(ext)
         new_item.setCheckState(Qt.Checked)
         self.selected_filetypes.addItem(new_item)
+        self.text_file_extensions.add(ext)
         self.custom_filetype_input.clear()
         logging.info(f"Added custom file extension: {ext}")
 
@@ -782,22 +1350,16 @@ class ConcatenatorApp(QWidget):
         copy_to_clipboard = self.copy_to_clipboard_radio.isChecked() or self.simultaneous_checkbox.isChecked()
         save_to_file = self.save_to_file_radio.isChecked() or self.simultaneous_checkbox.isChecked()
 
-        # Gather ignore patterns from lists
-        current_directory_ignore_patterns = [self.ignore_dir_list.item(i).text() for i in range(self.ignore_dir_list.count())]
-        current_file_ignore_patterns = [self.ignore_file_list.item(i).text() for i in range(self.ignore_file_list.count())]
-
-        # Gather include file extensions from selected_filetypes
-        self.text_file_extensions = set()
-        for i in range(self.selected_filetypes.count()):
-            item = self.selected_filetypes.item(i)
-            if item.checkState() == Qt.Checked:
-                self.text_file_extensions.add(item.text().lower())
-
+        # The include extensions and ignore lists are kept in sync by their handlers, so
+        # validation needs no widget scans and the lists are only copied once it passes
         if not self.text_file_extensions and save_to_file:
             QMessageBox.warning(self, "No File Types Selected", "Please select at least one file type to include.")
             logging.warning("Generate clicked without any file types selected.")
             return
 
+        current_directory_ignore_patterns = list(self.directory_ignore_patterns)
+        current_file_ignore_patterns = list(self.file_ignore_patterns)
+
         # Disable UI elements during processing
         self.toggle_ui(False)
 
@@ -811,46 +1373,51 @@ class ConcatenatorApp(QWidget):
         self.thread = FileConcatenatorThread(
             selected_paths,
             git_tracked=self.git_tracked_radio.isChecked(),
+            respect_gitignore=self.respect_gitignore_checkbox.isChecked(),
             directory_ignore_patterns=current_directory_ignore_patterns,
             file_ignore_patterns=current_file_ignore_patterns,
-            include_extensions=self.text_file_extensions
+            include_extensions=self.text_file_extensions,
+            root_directory=self.selected_directory,
+            output_file_path=self.output_file_path if save_to_file else None,
+            collect_output=copy_to_clipboard
         )
         self.thread.progress_update.connect(self.update_progress)
         self.thread.status_update.connect(self.update_status)
         self.thread.error_occurred.connect(self.handle_error)
-        self.thread.finished_successfully.connect(lambda text, files, errors: self.concatenation_finished(text, files, errors, copy_to_clipboard, save_to_file))
+        self.thread.finished_successfully.connect(lambda summary, files, errors: self.concatenation_finished(summary, files, errors, copy_to_clipboard, save_to_file))
+        self.thread.finished.connect(self.handle_thread_finished)
         self.thread.start()
         logging.info("Concatenation thread started.")
 
         # Enable cancel button
         self.cancel_button.setEnabled(True)
 
+    def handle_thread_finished(self):
+        # Drop the worker once run() has returned so its file lists and caches can be freed.
+        # A newer run may already have replaced it, and only the current one is released.
+        if self.sender() is self.thread:
+            self.thread.wait()  # finished is emitted just before the thread actually exits
+            self.thread = None
+
     def cancel_concatenation(self):
-        if hasattr(self, 'thread') and self.thread.isRunning():
+        if self.thread is not None and self.thread.isRunning():
             self.thread.cancel()
             self.status_label.setText("Status: Cancelling...")
             self.cancel_button.setEnabled(False)
             logging.info("Cancellation initiated by user.")
 
     def get_selected_paths(self):
-        selected = []
-        root = self.tree_widget.invisibleRootItem()
-        for i in range(root.childCount()):
-            child = root.child(i)
-            self.collect_checked(child, selected)
-        logging.debug(f"Selected paths for concatenation: {selected}")
+        # Sorted so the output order does not depend on the order items were checked
+        selected = sorted(self.checked_paths)
+        if logging.getLogger().isEnabledFor(logging.DEBUG):  # The list can be long; only format it when logged
+            logging.debug(f"Selected paths for concatenation: {selected}")
         return selected
 
-    def collect_checked(self, item, selected):
-        if item.checkState(0) == Qt.Checked:
-            selected.append(item.text(1))
-        for i in range(item.childCount()):
-            child = item.child(i)
-            self.collect_checked(child, selected)
-
-    def update_progress(self, value, current_file):
+    def update_progress(self, done, total, current_file):
+        # The worker sends raw counts; the label text is only built here, per update shown
+        value = done * 100 // total
         self.progress_bar.setValue(value)
-        self.status_label.setText(f"Processing: {current_file} ({value}%)")
+        self.status_label.setText(f"Status: Processing {current_file} ({done}/{total})")
         logging.debug(f"Progress updated: {current_file} ({value}%)")
 
     def update_status(self, message):
@@ -858,65 +1425,64 @@ class ConcatenatorApp(QWidget):
         logging.debug(f"Status updated: {message}")
 
     def handle_error(self, error_message):
-        self.error_log.append(error_message)
+        self.error_log.appendPlainText(error_message)
         QMessageBox.critical(self, "Error", error_message)
         self.toggle_ui(True)
         self.status_label.setText("Status: Error occurred.")
         self.cancel_button.setEnabled(False)
         logging.error(f"Error occurred: {error_message}")
 
-    def concatenation_finished(self, concatenated_text, all_files, error_list, copy_to_clipboard, save_to_file):
-        # Generate file tree string
-        file_tree = self.generate_file_tree(all_files)
-
-        # Combine file tree and concatenated text
-        final_output = f"Output File Tree:\n{file_tree}\n\nConcatenated Contents:\n{concatenated_text}"
+    def concatenation_finished(self, summary, all_files, error_list, copy_to_clipboard, save_to_file):
+        output_header = format_output_header(summary['file_tree'])
 
         # Calculate tokens and length
-        word_count = len(concatenated_text.split())
-        char_count = len(concatenated_text)
-        total_length = len(final_output)
+        word_count = summary['word_count']
+        char_count = summary['char_count']
+        total_length = len(output_header) + char_count
 
-        # Display preview (limit to first 1000 characters)
-        preview_content = final_output[:1000] + ('...' if len(final_output) > 1000 else '')
+        # Display preview (limit to first PREVIEW_CHARS characters)
+        preview_content = (output_header + summary['preview'].decode('utf-8', errors='replace'))[:PREVIEW_CHARS]
+        preview_content += '...' if total_length > PREVIEW_CHARS else ''
         self.preview_text.setPlainText(preview_content)
         logging.debug("Preview updated with concatenated content.")
 
         # Handle errors
         if error_list:
-            self.error_log.append("\nErrors Encountered:")
-            for error in error_list:
-                self.error_log.append(error)
+            self.error_log.appendPlainText("\nErrors Encountered:\n" + "\n".join(error_list))  # One reflow for the batch
             logging.warning(f"Concatenation completed with errors: {error_list}")
 
         # Handle output options
         if copy_to_clipboard:
             try:
+                # Hand Qt the UTF-8 bytes as they are; converting to text is left to the
+                # platform clipboard when another application actually pastes
+                mime_data = QMimeData()
+                mime_data.setData("text/plain", QByteArray(summary['content']))
                 clipboard = QApplication.clipboard()
-                clipboard.setText(final_output)
+                clipboard.setMimeData(mime_data)
                 logging.info("Concatenated text copied to clipboard.")
             except Exception as e:
-                self.error_log.append(f"Failed to copy to clipboard: {str(e)}")
+                self.error_log.appendPlainText(f"Failed to copy to clipboard: {str(e)}")
                 QMessageBox.critical(self, "Clipboard Error", f"Failed to copy to clipboard: {str(e)}")
                 logging.exception(f"Failed to copy to clipboard: {str(e)}")
 
         if save_to_file:
-            try:
-                with open(self.output_file_path, 'w', encoding='utf-8') as outfile:
-                    outfile.write(final_output)
-                logging.info(f"Concatenated text saved to file: {self.output_file_path}")
-            except Exception as e:
-                self.error_log.append(f"Failed to save file: {str(e)}")
-                QMessageBox.critical(self, "Save Error", f"Failed to save file: {str(e)}")
-                logging.exception(f"Failed to save file: {str(e)}")
-            else:
-                QMessageBox.information(
-                    self,
-                    "Success",
-                    f"Files have been concatenated successfully.\nSaved to {self.output_file_path}\n\n"
-                    f"Words: {word_count}\nCharacters: {char_count}\nTotal Length: {total_length} characters."
-                )
-                logging.info("Success message displayed to user.")
+            # The worker thread has already streamed the output to the file. The box is
+            # non-modal so the rest of this handler (re-enabling the UI) runs right away;
+            # the reference keeps it alive, and a newer result replaces an older box.
+            if self.success_box is not None:
+                self.success_box.close()
+            self.success_box = QMessageBox(
+                QMessageBox.Information,
+                "Success",
+                f"Files have been concatenated successfully.\nSaved to {self.output_file_path}\n\n"
+                f"Words: {word_count}\nCharacters: {char_count}\nTotal Length: {total_length} characters.",
+                QMessageBox.Ok,
+                self
+            )
+            self.success_box.setModal(False)
+            self.success_box.show()
+            logging.info("Success message displayed to user.")
 
         # Show summary in status
         if not error_list:
@@ -930,62 +1496,17 @@ class ConcatenatorApp(QWidget):
         self.toggle_ui(True)
         self.cancel_button.setEnabled(False)
 
-    def generate_file_tree(self, files):
-        # Build a nested dictionary to represent the tree
-        tree = {}
-        for file_path in files:
-            try:
-                parts = os.path.relpath(file_path, self.selected_directory).split(os.sep)
-                current_level = tree
-                for part in parts[:-1]:
-                    current_level = current_level.setdefault(part, {})
-                current_level[parts[-1]] = None  # File
-            except ValueError:
-                # In case file_path is not under selected_directory
-                tree[os.path.basename(file_path)] = None
-
-        # Convert the nested dictionary to a string with indentation
-        def traverse(d, indent=0):
-            tree_str = ""
-            for key in sorted(d.keys()):
-                tree_str += "    " * indent + f"- {key}\n"
-                if isinstance(d[key], dict):
-                    tree_str += traverse(d[key], indent + 1)
-            return tree_str
-
-        return traverse(tree)
-
     def toggle_ui(self, enabled):
-        # Selection Tab
-        self.select_dir_button.setEnabled(enabled)
-        self.tree_widget.setEnabled(enabled)
-        self.select_all_button.setEnabled(enabled)
-        self.deselect_all_button.setEnabled(enabled)
-        self.search_bar.setEnabled(enabled)
-
-        # Preferences Tab
-        self.all_files_radio.setEnabled(enabled)
-        self.git_tracked_radio.setEnabled(enabled)
-        self.ignore_dir_list.setEnabled(enabled)
-        self.add_ignore_dir_button.setEnabled(enabled)
-        self.remove_ignore_dir_button.setEnabled(enabled)
-        self.ignore_file_list.setEnabled(enabled)
-        self.add_ignore_file_button.setEnabled(enabled)
-        self.remove_ignore_file_button.setEnabled(enabled)
-        self.available_filetypes.setEnabled(enabled)
-        self.selected_filetypes.setEnabled(enabled)
-        self.add_filetype_button.setEnabled(enabled)
-        self.remove_filetype_button.setEnabled(enabled)
-        self.custom_filetype_input.setEnabled(enabled)
-        self.add_custom_filetype_button.setEnabled(enabled)
+        # Disabling a tab page disables every control on it, so each page is toggled as
+        # a whole; re-enabling it restores the children to their own enabled state
+        self.selection_tab.setEnabled(enabled)
+        self.preferences_tab.setEnabled(enabled)
+        self.output_tab.setEnabled(enabled)
 
-        # Output Tab
-        self.save_to_file_radio.setEnabled(enabled)
-        self.copy_to_clipboard_radio.setEnabled(enabled)
-        self.simultaneous_checkbox.setEnabled(enabled)
-        self.select_save_button.setEnabled(enabled and (self.save_to_file_radio.isChecked() or self.simultaneous_checkbox.isChecked()))
-        self.save_path_edit.setEnabled(enabled and (self.save_to_file_radio.isChecked() or self.simultaneous_checkbox.isChecked()))
-        self.preview_text.setEnabled(enabled)
+        # The save location controls only apply when saving to a file
+        save_enabled = self.save_to_file_radio.isChecked() or self.simultaneous_checkbox.isChecked()
+        self.select_save_button.setEnabled(save_enabled)
+        self.save_path_edit.setEnabled(save_enabled)
 
         # Buttons
         self.generate_button.setEnabled(enabled)
@@ -998,8 +1519,13 @@ class ConcatenatorApp(QWidget):
     def closeEvent(self, event):
         self.save_config()
         try:
-            if hasattr(self, 'thread') and self.thread.isRunning():
-                self.thread.terminate()
+            if self.thread is not None and self.thread.isRunning():
+                # Ask the worker to stop at its next cancellation check; terminate only as a last resort
+                self.thread.cancel()
+                if not self.thread.wait(THREAD_STOP_TIMEOUT_MS):
+                    self.thread.terminate()
+                    self.thread.wait()
+                    logging.warning("Concatenation thread did not stop in time and was terminated.")
                 logging.info("Application closed while concatenation thread was running.")
         except:
             pass
@@ -1007,19 +1533,23 @@ class ConcatenatorApp(QWidget):
         logging.info("Application closed.")
 
     def update_text_file_extensions(self):
-        # Initialize text_file_extensions based on selected_filetypes
-        self.text_file_extensions = set()
-        for i in range(self.selected_filetypes.count()):
-            item = self.selected_filetypes.item(i)
-            if item.checkState() == Qt.Checked:
-                self.text_file_extensions.add(item.text().lower())
+        # Initialize text_file_extensions based on selected_filetypes; afterwards
+        # handle_filetype_changed and the move/add handlers keep it up to date
+        filetypes = self.selected_filetypes
+        self.text_file_extensions = {
+            item.text().lower()
+            for item in (filetypes.item(i) for i in range(filetypes.count()))
+            if item.checkState() == Qt.Checked
+        }
         logging.debug(f"Updated text file extensions: {self.text_file_extensions}")
 
 def main():
     app = QApplication(sys.argv)
     window = ConcatenatorApp()
     window.show()
-    sys.exit(app.exec_())
+    exit_code = app.exec_()
+    log_listener.stop()  # Flush the queued log records before exiting
+    sys.exit(exit_code)
 
 if __name__ == "__main__":
     main()